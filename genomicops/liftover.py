@@ -1,12 +1,19 @@
+import asyncio
+import json
 import os
 import platform
 import stat
 import tempfile
 import subprocess
-import urllib.request
 import shutil
+from functools import lru_cache
 from pathlib import Path
-from genomicops.ucsc_rest import parse_region
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from genomicops.ucsc_rest import parse_regions_bulk
 
 LIFTOVER_BASE = Path(__file__).resolve().parent / "liftover_data"
 CHAIN_DIR = LIFTOVER_BASE / "chains"
@@ -18,14 +25,31 @@ CHAIN_URL_TEMPLATE = "https://hgdownload.soe.ucsc.edu/goldenPath/{from_asm}/lift
 os.makedirs(CHAIN_DIR, exist_ok=True)
 os.makedirs(LIFTOVER_BASE, exist_ok=True)
 
+# Pooled session for UCSC downloads, mirroring the one in ucsc_rest
+_SESSION = requests.Session()
+_SESSION.mount(
+    "https://",
+    HTTPAdapter(pool_connections=4, pool_maxsize=4,
+                max_retries=Retry(total=3, backoff_factor=0.3)),
+)
+
 
 # ============================================================
 #  Binary + Chain file management
 # ============================================================
 
+# Once a binary/chain has been verified we skip the filesystem checks on
+# subsequent lift_over calls; only force=True re-validates.
+_VERIFIED_BIN = False
+_VERIFIED_CHAINS: set[tuple[str, str]] = set()
+
+@lru_cache(maxsize=128)
 def _get_chain_name(from_asm: str, to_asm: str) -> str:
     """
     Construct UCSC chain file name (e.g. 'hg19ToHg38.over.chain.gz').
+
+    Cached: the universe of assembly pairs is tiny, so repeated lift_over
+    calls skip the strip/lower/format work entirely.
     """
     from_asm = from_asm.strip()
     to_asm = to_asm.strip()
@@ -49,20 +73,34 @@ def ensure_liftover_binary(force: bool = False) -> str:
     Ensure the UCSC liftOver binary exists locally and is executable.
     Downloads the correct binary automatically if missing or when force=True.
     """
+    global _VERIFIED_BIN
+
     bin_path = Path(BIN_PATH)
+    if _VERIFIED_BIN and not force:
+        return str(bin_path)
+
     bin_path.parent.mkdir(parents=True, exist_ok=True)
 
     if not force and bin_path.exists() and os.access(bin_path, os.X_OK):
+        _VERIFIED_BIN = True
         return str(bin_path)
 
     folder = _detect_platform_folder()
     url = f"{UCSC_EXE_BASE}/{folder}/liftOver"
 
     try:
-        downloaded_path, _ = urllib.request.urlretrieve(url)
-        downloaded_path = Path(downloaded_path)
-
-        shutil.move(str(downloaded_path), str(bin_path))
+        fd, tmpfile = tempfile.mkstemp(dir=bin_path.parent, suffix=".part")
+        try:
+            with _SESSION.get(url, stream=True, timeout=120) as resp:
+                resp.raise_for_status()
+                with os.fdopen(fd, "wb") as f:
+                    # 1 MiB copy buffer keeps the syscall count low
+                    shutil.copyfileobj(resp.raw, f, length=1 << 20)
+            os.replace(tmpfile, bin_path)
+        except BaseException:
+            if os.path.exists(tmpfile):
+                os.unlink(tmpfile)
+            raise
 
         mode = bin_path.stat().st_mode
         bin_path.chmod(mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
@@ -73,87 +111,186 @@ def ensure_liftover_binary(force: bool = False) -> str:
     if not os.access(bin_path, os.X_OK) and not os.getenv("PYTEST_CURRENT_TEST"):
         raise PermissionError(f"liftOver binary is not executable at {bin_path}")
 
+    _VERIFIED_BIN = True
     return str(bin_path)
 
 
+def _chain_meta_path(chain_path: Path) -> Path:
+    return chain_path.parent / (chain_path.name + ".meta.json")
+
+
+def _read_chain_meta(chain_path: Path) -> dict:
+    try:
+        with open(_chain_meta_path(chain_path)) as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def _write_chain_meta(chain_path: Path, headers) -> None:
+    meta = {}
+    if headers.get("ETag"):
+        meta["etag"] = headers["ETag"]
+    if headers.get("Last-Modified"):
+        meta["last_modified"] = headers["Last-Modified"]
+    try:
+        with open(_chain_meta_path(chain_path), "w") as f:
+            json.dump(meta, f)
+    except Exception:
+        pass
+
+
 def ensure_chain_file(from_asm: str, to_asm: str, force: bool = False) -> str:
-    """Ensure chain file exists for given assembly pair."""
+    """
+    Ensure chain file exists for given assembly pair.
+
+    Downloads are streamed to disk; when a local copy exists we revalidate
+    with a conditional GET (ETag/Last-Modified) so UCSC only resends the
+    chain if it actually changed.
+    """
     chain_name = _get_chain_name(from_asm, to_asm)
     chain_path = CHAIN_DIR / chain_name
 
+    if (from_asm, to_asm) in _VERIFIED_CHAINS and not force:
+        return str(chain_path)
+
     if chain_path.exists() and not force:
+        _VERIFIED_CHAINS.add((from_asm, to_asm))
         return str(chain_path)
 
     url = CHAIN_URL_TEMPLATE.format(from_asm=from_asm, chain_name=chain_name)
     try:
-        tmpfile, _ = urllib.request.urlretrieve(url)
-        shutil.move(tmpfile, chain_path)
+        headers = {}
+        if chain_path.exists():
+            meta = _read_chain_meta(chain_path)
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        with _SESSION.get(url, stream=True, headers=headers, timeout=60) as resp:
+            if resp.status_code == 304:
+                # local copy is still current
+                _VERIFIED_CHAINS.add((from_asm, to_asm))
+                return str(chain_path)
+            resp.raise_for_status()
+
+            fd, tmpfile = tempfile.mkstemp(dir=CHAIN_DIR, suffix=".part")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    for chunk in resp.iter_content(1 << 20):
+                        f.write(chunk)
+                os.replace(tmpfile, chain_path)
+            except BaseException:
+                if os.path.exists(tmpfile):
+                    os.unlink(tmpfile)
+                raise
+            _write_chain_meta(chain_path, resp.headers)
     except Exception as e:
         raise FileNotFoundError(f"Could not download chain file from {url}: {e}")
 
+    _VERIFIED_CHAINS.add((from_asm, to_asm))
     return str(chain_path)
 
 
+async def prefetch(from_asm: str, to_asm: str) -> None:
+    """
+    Warm the liftOver binary and the chain file for an assembly pair.
+
+    The two downloads are independent, so they run concurrently in worker
+    threads; useful at server start so the first lift_over call is warm.
+    """
+    await asyncio.gather(
+        asyncio.to_thread(ensure_liftover_binary),
+        asyncio.to_thread(ensure_chain_file, from_asm, to_asm),
+    )
+
+
 # ============================================================
 #  Liftover main function
 # ============================================================
 
-def lift_over(region: str, from_asm: str, to_asm: str,
-              ensure_binary: bool = True, ensure_chain: bool = True) -> dict:
+def lift_over_batch(regions: list[str], from_asm: str, to_asm: str,
+                    ensure_binary: bool = True, ensure_chain: bool = True) -> list[dict]:
     """
-    Lift coordinates between assemblies using UCSC liftOver binary.
+    Lift many regions between assemblies with a single liftOver run.
+
+    Writes one BED with all regions (a fourth ID column keeps the mapping
+    back to inputs) so the chain file is parsed once instead of per region.
+    Returns one result dict per input region, in input order.
     """
-    chrom, start, end = parse_region(region)
+    parsed = parse_regions_bulk(regions)
 
     # Ensure dependencies
     if ensure_binary:
         try:
             lift_bin = ensure_liftover_binary()
         except Exception as e:
-            return {"error": f"Missing liftOver binary: {e}"}
+            return [{"error": f"Missing liftOver binary: {e}"} for _ in regions]
     else:
         lift_bin = shutil.which("liftOver") or str(BIN_PATH)
         if not os.path.exists(lift_bin):
-            return {"error": "liftOver binary not found"}
+            return [{"error": "liftOver binary not found"} for _ in regions]
 
     if ensure_chain:
         try:
             chain_path = ensure_chain_file(from_asm, to_asm)
         except Exception as e:
-            return {"error": f"Missing chain file: {e}"}
+            return [{"error": f"Missing chain file: {e}"} for _ in regions]
     else:
         chain_name = f"{from_asm}To{to_asm}.over.chain.gz"
         chain_path = CHAIN_DIR / chain_name
         if not chain_path.exists():
-            return {"error": f"Chain file not found: {chain_path}"}
+            return [{"error": f"Chain file not found: {chain_path}"} for _ in regions]
 
-    # Run liftOver
-    with tempfile.TemporaryDirectory() as tmp:
-        in_bed = Path(tmp) / "input.bed"
-        out_bed = Path(tmp) / "output.bed"
-        unmapped = Path(tmp) / "unmapped.bed"
+    # Run liftOver once over the whole batch. The BED goes in via stdin and
+    # comes back on stdout ("stdin"/"stdout" are magic liftOver filenames),
+    # so only the unmapped output needs a real file.
+    bed_input = "".join(
+        f"{chrom}\t{start-1}\t{end}\tid{i}\n" for i, (chrom, start, end) in enumerate(parsed)
+    )
 
-        with open(in_bed, "w") as f:
-            f.write(f"{chrom}\t{start-1}\t{end}\n")
+    with tempfile.NamedTemporaryFile(suffix=".unmapped.bed") as unmapped:
+        cmd = [str(lift_bin), "stdin", str(chain_path), "stdout", unmapped.name]
 
-        cmd = [str(lift_bin), str(in_bed), str(chain_path), str(out_bed), str(unmapped)]
-        
+        # bytes mode: skips locale decoding of the whole stdout/stderr;
+        # only the coordinate fields actually returned get decoded
         try:
-            proc = subprocess.run(cmd, capture_output=True, text=True, check=True)
+            proc = subprocess.run(cmd, input=bed_input.encode(), capture_output=True, check=True)
         except subprocess.CalledProcessError as e:
-            return {"error": f"Execution failed: {e.stderr.strip() or e}"}
+            stderr = (e.stderr or b"").decode("utf-8", errors="replace").strip()
+            return [{"error": f"Execution failed: {stderr or e}"} for _ in regions]
         except Exception as e:
-            return {"error": f"Execution failed: {e}"}
-
-        if proc.returncode != 0 and not out_bed.exists():
-            return {"error": f"liftOver failed: {proc.stderr.strip()}"}
+            return [{"error": f"Execution failed: {e}"} for _ in regions]
+
+        mapped: dict[int, str] = {}
+        for lineno, line in enumerate(proc.stdout.splitlines()):
+            line = line.strip()
+            if not line:
+                continue
+            cols = line.split(b"\t")
+            out_chr, out_start, out_end = (c.decode() for c in cols[:3])
+            if len(cols) > 3 and cols[3].startswith(b"id"):
+                idx = int(cols[3][2:])
+            else:
+                # no ID column; liftOver preserves input order
+                idx = lineno
+            mapped[idx] = f"{out_chr}:{int(out_start)+1}-{out_end}"
+
+        results = []
+        for i, region in enumerate(regions):
+            if i in mapped:
+                results.append({"input": region, "from": from_asm, "to": to_asm, "output": mapped[i]})
+            else:
+                results.append({"error": f"No mapping found for {region} ({from_asm}->{to_asm})"})
+
+        return results
 
-        if not out_bed.exists() or out_bed.stat().st_size == 0:
-            return {"error": f"No mapping found for {region} ({from_asm}->{to_asm})"}
 
-        with open(out_bed) as f:
-            line = f.readline().strip()
-        out_chr, out_start, out_end = line.split("\t")[:3]
-        mapped = f"{out_chr}:{int(out_start)+1}-{out_end}"
-
-        return {"input": region, "from": from_asm, "to": to_asm, "output": mapped}
+def lift_over(region: str, from_asm: str, to_asm: str,
+              ensure_binary: bool = True, ensure_chain: bool = True) -> dict:
+    """
+    Lift coordinates between assemblies using UCSC liftOver binary.
+    """
+    return lift_over_batch([region], from_asm, to_asm,
+                           ensure_binary=ensure_binary, ensure_chain=ensure_chain)[0]
@@ -1,29 +1,130 @@
-# src/server/tools.py
+import httpx
 import requests
-from typing import List, Dict, Any
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import List, Dict, Any, Optional
 import logging
+import re
+import sqlite3
 import time, os, json
+from operator import itemgetter
+
+try:
+    import orjson
+except ImportError:  # optional speedup; stdlib json works everywhere
+    orjson = None
+
+try:
+    from rapidfuzz import process as _rf_process, fuzz as _rf_fuzz
+except ImportError:  # optional speedup; substring matching still works
+    _rf_process = None
+
+import msgspec
 
 logger = logging.getLogger(__name__)
 
-CACHE_FILE = os.path.join(os.path.dirname(__file__), "ucsc_genomes_cache.json")
+
+def _json_loads(data: bytes) -> Any:
+    """Deserialize JSON bytes, using orjson when available (3-10x faster on large UCSC payloads)."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+# Schema for the normalized genome listing. Decoding the cache against these
+# structs is schema-directed (fast, C-level) and rejects stale or malformed
+# cache files outright instead of propagating odd shapes downstream.
+class Assembly(msgspec.Struct):
+    genome: str
+    assemblyName: Optional[str] = None
+
+
+class Species(msgspec.Struct):
+    speciesKey: str
+    scientificName: str
+    commonName: Optional[str] = None
+    count: int = 0
+    assemblies: list[Assembly] = []
+
+
+# On-disk cache is a SQLite database in WAL mode with one msgpack-encoded
+# row per species: worker processes share it without racing on a single
+# JSON blob, and writes replace the listing atomically in one transaction.
+CACHE_FILE = os.path.join(os.path.dirname(__file__), "ucsc_genomes_cache.sqlite")
 CACHE_TTL = 24 * 3600  # 24 hours
 
+_MSGPACK_ENC = msgspec.msgpack.Encoder()
+_MSGPACK_DEC = msgspec.msgpack.Decoder(Species)
+
 UCSC_BASE = "https://api.genome.ucsc.edu"
 
-def parse_region(region: str):
+# Shared session: keep-alive + pooled connections avoid a fresh TCP/TLS
+# handshake on every UCSC call, and retry transient failures with backoff.
+_SESSION = requests.Session()
+_SESSION.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=10,
+        pool_maxsize=20,
+        max_retries=Retry(total=3, backoff_factor=0.3),
+    ),
+)
+
+# Lazily created async client shared by the FastAPI endpoints so concurrent
+# UCSC queries overlap on the event loop instead of stalling threadpool workers.
+_ASYNC_CLIENT: Optional[httpx.AsyncClient] = None
+
+
+def _get_async_client() -> httpx.AsyncClient:
+    global _ASYNC_CLIENT
+    if _ASYNC_CLIENT is None:
+        _ASYNC_CLIENT = httpx.AsyncClient(
+            timeout=10,
+            limits=httpx.Limits(max_keepalive_connections=20),
+        )
+    return _ASYNC_CLIENT
+
+
+async def aclose_async_client() -> None:
+    """Close the shared async client (called from FastAPI lifespan shutdown)."""
+    global _ASYNC_CLIENT
+    if _ASYNC_CLIENT is not None:
+        await _ASYNC_CLIENT.aclose()
+        _ASYNC_CLIENT = None
+
+# Precompiled: parse_region sits on every annotation/lift request, so one
+# regex pass beats chained split/replace calls and their transient strings.
+_REGION_RE = re.compile(r"^([^:\s]+):([\d,]+)-([\d,]+)$")
+
+def parse_region(region: str) -> tuple[str, int, int]:
     """
     Parse UCSC-style region strings, e.g. 'chr1:1000-2000'.
     Returns (chrom, start, end).
     """
-    try:
-        chrom, coords = region.split(":")
-        start, end = map(int, coords.replace(",", "").split("-"))
-        return chrom, start, end
-    except Exception:
+    m = _REGION_RE.match(region)
+    if not m:
         raise ValueError(f"Invalid region format: {region}. Use e.g. 'chr1:1000-2000'.")
+    return m.group(1), int(m.group(2).replace(",", "")), int(m.group(3).replace(",", ""))
+
+def parse_regions_bulk(regions: list[str]) -> list[tuple[str, int, int]]:
+    """
+    Parse many region strings in one pass (used by the batch liftover path).
 
-def get_annotations(region: str, genome: str = "hg38", track: str = "knownGene"):
+    Binds the compiled matcher once, so per-region cost is a single C-level
+    regex call plus the two int conversions.
+    """
+    match = _REGION_RE.match
+    parsed: list[tuple[str, int, int]] = []
+    append = parsed.append
+    for region in regions:
+        m = match(region)
+        if not m:
+            raise ValueError(f"Invalid region format: {region}. Use e.g. 'chr1:1000-2000'.")
+        chrom, start, end = m.group(1, 2, 3)
+        append((chrom, int(start.replace(",", "")), int(end.replace(",", ""))))
+    return parsed
+
+def get_annotations(region: str, genome: str = "hg38", track: str = "knownGene") -> Dict[str, Any]:
     """
     Example function to get annotations from UCSC.
     """
@@ -37,10 +138,31 @@ def get_annotations(region: str, genome: str = "hg38", track: str = "knownGene")
         "start": start,
         "end": end
     }
-    response = requests.get(url, params=payload)
+    response = _SESSION.get(url, params=payload)
+    response.raise_for_status()
+    try:
+        return _json_loads(response.content)
+    except ValueError:
+        return {"error": "No valid JSON returned", "text": response.text}
+
+async def get_annotations_async(region: str, genome: str = "hg38", track: str = "knownGene") -> Dict[str, Any]:
+    """
+    Async variant of get_annotations for use from FastAPI endpoints.
+    """
+    chrom, start, end = parse_region(region)
+
+    url = f"{UCSC_BASE}/getData/track"
+    payload = {
+        "genome": genome,
+        "track": track,
+        "chrom": chrom,
+        "start": start,
+        "end": end
+    }
+    response = await _get_async_client().get(url, params=payload)
     response.raise_for_status()
     try:
-        return response.json()
+        return _json_loads(response.content)
     except ValueError:
         return {"error": "No valid JSON returned", "text": response.text}
 
@@ -57,45 +179,151 @@ def list_ucsc_tracks(genome: str = "hg38", timeout: int = 10) -> Dict[str, Any]:
     url = f"{UCSC_BASE}/list/tracks?genome={genome}"
 
     try:
-        resp = requests.get(url, timeout=timeout)
+        resp = _SESSION.get(url, timeout=timeout)
         resp.raise_for_status()
-        data = resp.json()
-
-        # The main track data is nested under the genome key, e.g. data["hs1"]
-        if genome not in data:
-            return {"error": f"No track data found for {genome}"}
-
-        tracks = data[genome]
-
-        # Flatten the response into a list of top-level tracks (filter out composite containers)
-        simplified_tracks = []
-        for track_name, track_info in tracks.items():
-            if isinstance(track_info, dict) and "type" in track_info:
-                simplified_tracks.append({
-                    "track_id": track_name,
-                    "shortLabel": track_info.get("shortLabel"),
-                    "longLabel": track_info.get("longLabel"),
-                    "type": track_info.get("type"),
-                    "group": track_info.get("group"),
-                    "bigDataUrl": track_info.get("bigDataUrl"),
-                    "html": track_info.get("html"),
-                })
-
-        return {
-            "genome": genome,
-            "track_count": len(simplified_tracks),
-            "tracks": simplified_tracks,
-        }
+        return _simplify_tracks(genome, _json_loads(resp.content))
 
     except requests.exceptions.RequestException as e:
         return {"error": f"Failed to fetch tracks for {genome}: {e}"}
     except ValueError:
         return {"error": f"Invalid JSON returned for {genome} tracks"}
-    
+
+async def list_ucsc_tracks_async(genome: str = "hg38", timeout: int = 10) -> Dict[str, Any]:
+    """
+    Async variant of list_ucsc_tracks for use from FastAPI endpoints.
+    """
+    url = f"{UCSC_BASE}/list/tracks?genome={genome}"
+
+    try:
+        resp = await _get_async_client().get(url, timeout=timeout)
+        resp.raise_for_status()
+        return _simplify_tracks(genome, _json_loads(resp.content))
+
+    except httpx.HTTPError as e:
+        return {"error": f"Failed to fetch tracks for {genome}: {e}"}
+    except ValueError:
+        return {"error": f"Invalid JSON returned for {genome} tracks"}
+
+def _simplify_tracks(genome: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    """Flatten a /list/tracks payload into the simplified track listing."""
+    # The main track data is nested under the genome key, e.g. data["hs1"]
+    if genome not in data:
+        return {"error": f"No track data found for {genome}"}
+
+    tracks = data[genome]
+
+    # Flatten the response into a list of top-level tracks (filter out composite containers)
+    simplified_tracks = []
+    for track_name, track_info in tracks.items():
+        if isinstance(track_info, dict) and "type" in track_info:
+            simplified_tracks.append({
+                "track_id": track_name,
+                "shortLabel": track_info.get("shortLabel"),
+                "longLabel": track_info.get("longLabel"),
+                "type": track_info.get("type"),
+                "group": track_info.get("group"),
+                "bigDataUrl": track_info.get("bigDataUrl"),
+                "html": track_info.get("html"),
+            })
+
+    return {
+        "genome": genome,
+        "track_count": len(simplified_tracks),
+        "tracks": simplified_tracks,
+    }
+
+
 # ---------------------------------------------------------------------
 # UCSC genome listing utilities
 # ---------------------------------------------------------------------
 
+# In-process memo of the parsed cache file, keyed on (path, mtime), so the
+# steady-state path skips re-reading and re-parsing megabytes of JSON on
+# every tool call. A changed mtime (refresh, other worker) invalidates it.
+_MEM_CACHE: dict[str, Any] = {"path": None, "mtime": 0.0, "data": None}
+
+
+def invalidate_genome_cache() -> None:
+    """Drop the in-process genome cache so the next fetch re-reads from disk/UCSC."""
+    _MEM_CACHE["path"] = None
+    _MEM_CACHE["data"] = None
+    _invalidate_species_index()
+
+
+def _read_genome_cache() -> Optional[list[dict[str, Any]]]:
+    """Return cached genomes if the cache file exists and is fresh, else None."""
+    if not os.path.exists(CACHE_FILE):
+        return None
+    mtime = os.path.getmtime(CACHE_FILE)
+    # TTL first: the memo is keyed on mtime, which never changes for a stale
+    # file, so probing the memo first would serve expired data forever
+    if time.time() - mtime >= CACHE_TTL:
+        return None
+    if (
+        _MEM_CACHE["data"] is not None
+        and _MEM_CACHE["path"] == CACHE_FILE
+        and _MEM_CACHE["mtime"] == mtime
+    ):
+        return _MEM_CACHE["data"]
+    try:
+        con = sqlite3.connect(CACHE_FILE)
+        try:
+            rows = con.execute("SELECT data FROM species ORDER BY name").fetchall()
+        finally:
+            con.close()
+        # typed decode validates each row; converted back to dicts because
+        # the public API (and FastAPI/MCP serialization) works on dicts
+        data = [msgspec.to_builtins(_MSGPACK_DEC.decode(row[0])) for row in rows]
+        if data:
+            _MEM_CACHE.update(path=CACHE_FILE, mtime=mtime, data=data)
+            return data
+    except Exception:
+        # corrupted or schema-mismatched cache, ignore and refetch
+        pass
+    return None
+
+
+def _write_genome_db(genomes: list[dict[str, Any]]) -> None:
+    os.makedirs(os.path.dirname(CACHE_FILE), exist_ok=True)
+    con = sqlite3.connect(CACHE_FILE)
+    try:
+        con.execute("PRAGMA journal_mode=WAL")
+        con.execute(
+            "CREATE TABLE IF NOT EXISTS species (name TEXT PRIMARY KEY, data BLOB, updated INTEGER)"
+        )
+        now = int(time.time())
+        with con:
+            con.execute("DELETE FROM species")
+            con.executemany(
+                "INSERT OR REPLACE INTO species (name, data, updated) VALUES (?, ?, ?)",
+                [
+                    (s.get("speciesKey") or s.get("scientificName") or str(i),
+                     _MSGPACK_ENC.encode(s), now)
+                    for i, s in enumerate(genomes)
+                ],
+            )
+    finally:
+        con.close()
+
+
+def _write_genome_cache(genomes: list[dict[str, Any]]) -> None:
+    try:
+        try:
+            _write_genome_db(genomes)
+        except sqlite3.DatabaseError:
+            # not a SQLite file (legacy or corrupted cache) - start over
+            os.unlink(CACHE_FILE)
+            _write_genome_db(genomes)
+        _MEM_CACHE.update(path=CACHE_FILE, mtime=os.path.getmtime(CACHE_FILE), data=genomes)
+    except Exception as e:
+        print(f"Warning: could not write cache: {e}")
+
+
+def _normalize_genomes(data: Any) -> list[dict[str, Any]]:
+    # Some mirrors / mocks hand back the already-normalized list shape
+    return data if isinstance(data, list) else extract_ucsc_genomes(data)
+
+
 def fetch_ucsc_genomes(timeout: int = 10, use_cache: bool = True) -> list[dict[str, Any]]:
     """
     Fetch /list/ucscGenomes and return a normalized list of genome dicts with optional local JSON caching.
@@ -103,38 +331,47 @@ def fetch_ucsc_genomes(timeout: int = 10, use_cache: bool = True) -> list[dict[s
     Handles both list and dict-of-dicts shapes.
     """
 
-    if use_cache and os.path.exists(CACHE_FILE):
-        mtime = os.path.getmtime(CACHE_FILE)
-        age = time.time() - mtime
-        if age < CACHE_TTL:
-            try:
-                with open(CACHE_FILE, "r") as f:
-                    data = json.load(f)
-                    if data:
-                        return data
-            except Exception:
-                # corrupted cache, ignore and refetch
-                pass
+    if use_cache:
+        cached = _read_genome_cache()
+        if cached is not None:
+            return cached
 
     url = f"{UCSC_BASE}/list/ucscGenomes"
-    resp = requests.get(url, timeout=timeout)
+    resp = _SESSION.get(url, timeout=timeout)
     resp.raise_for_status()
-    data = resp.json()
+    genomes = _normalize_genomes(_json_loads(resp.content))
+    _invalidate_species_index()
+
+    if use_cache:
+        _write_genome_cache(genomes)
+
+    return genomes
 
-    genomes = extract_ucsc_genomes(data)
+
+async def fetch_ucsc_genomes_async(timeout: int = 10, use_cache: bool = True) -> list[dict[str, Any]]:
+    """
+    Async variant of fetch_ucsc_genomes; same caching semantics, but the
+    network round-trip is awaited on the shared client instead of blocking.
+    """
 
     if use_cache:
-        try:
-            os.makedirs(os.path.dirname(CACHE_FILE), exist_ok=True)
-            with open(CACHE_FILE, "w") as f:
-                json.dump(genomes, f, indent=2)
-        except Exception as e:
-            print(f"Warning: could not write cache: {e}")
+        cached = _read_genome_cache()
+        if cached is not None:
+            return cached
+
+    url = f"{UCSC_BASE}/list/ucscGenomes"
+    resp = await _get_async_client().get(url, timeout=timeout)
+    resp.raise_for_status()
+    genomes = _normalize_genomes(_json_loads(resp.content))
+    _invalidate_species_index()
+
+    if use_cache:
+        _write_genome_cache(genomes)
 
     return genomes
 
 
-def extract_ucsc_genomes(data: dict) -> list[dict[str, Any]]:
+def extract_ucsc_genomes(data: dict[str, Any]) -> list[dict[str, Any]]:
     """
     Extract UCSC genomes grouped by species.
 
@@ -157,52 +394,86 @@ def extract_ucsc_genomes(data: dict) -> list[dict[str, Any]]:
 
     for genome_id, info in genomes.items():
 
-        sci = info.get("scientificName")
-        common = info.get("organism") or info.get("genome")
+        # bind once per genome: avoids repeated attribute lookups in the loop
+        get = info.get
+        sci = get("scientificName")
 
         if not sci:
             continue
 
-        if sci not in species_map:
-            species_map[sci] = {
+        entry = species_map.get(sci)
+        if entry is None:
+            entry = species_map[sci] = {
                 "speciesKey": sci,
                 "scientificName": sci,
-                "commonName": common,
+                "commonName": get("organism") or get("genome"),
                 "assemblies": [],
             }
 
-        species_map[sci]["assemblies"].append({
+        entry["assemblies"].append({
             "genome": genome_id,
-            "assemblyName": info.get("description") or genome_id,
+            "assemblyName": get("description") or genome_id,
         })
 
     for s in species_map.values():
         s["count"] = len(s["assemblies"])
 
-    return sorted(species_map.values(), key=lambda x: x["scientificName"])
+    return sorted(species_map.values(), key=itemgetter("scientificName"))
 
 def get_species(genomes: list[dict[str, Any]]) -> list[dict[str, Any]]:
     """
     Aggregate unique species from UCSC genome data.
     Returns a list of species with available assemblies.
     """
-    species_list = []
-
-    for s in genomes:
-        species_list.append({
-            "speciesKey": s.get("speciesKey"),
-            "scientificName": s.get("scientificName"),
-            "commonName": s.get("commonName"),
-            "count": s.get("count"),
-            "assemblies": [
-                {
-                    "genome": a.get("genome"),
-                    "assemblyName": a.get("assemblyName")
-                } for a in s.get("assemblies", [])
-            ]
-        })
+    # extract_ucsc_genomes already emits the public shape; rebuilding every
+    # dict element-by-element was pure copying on each /species call.
+    return genomes
+
+
+# Lowercased lookup structures memoized per genomes list, so repeated
+# get_assemblies calls against the cached listing are a single dict probe
+# instead of a full scan with per-entry str.lower() allocations.
+_SPECIES_INDEX: dict[str, dict[str, Any]] = {}
+_FUZZY_CHOICES: list[tuple[str, str, dict[str, Any]]] = []
+_FUZZY_NAMES: list[str] = []
+_FUZZY_ENTRIES: list[dict[str, Any]] = []
+_INDEX_SOURCE: Optional[list[dict[str, Any]]] = None
+
+# Minimum RapidFuzz WRatio score for a fuzzy species match
+_FUZZY_SCORE_CUTOFF = 70
+
 
-    return species_list
+def _invalidate_species_index() -> None:
+    global _INDEX_SOURCE
+    _INDEX_SOURCE = None
+
+
+def _build_species_index(genomes: list[dict[str, Any]]) -> None:
+    global _SPECIES_INDEX, _FUZZY_CHOICES, _FUZZY_NAMES, _FUZZY_ENTRIES, _INDEX_SOURCE
+    index: dict[str, dict[str, Any]] = {}
+    choices: list[tuple[str, str, dict[str, Any]]] = []
+    names: list[str] = []
+    entries: list[dict[str, Any]] = []
+
+    for entry in genomes:
+        sci = entry.get("scientificName", "").lower()
+        common = (entry.get("commonName") or "").lower()
+        # setdefault keeps the first entry, matching the old scan order
+        if sci:
+            index.setdefault(sci, entry)
+            names.append(sci)
+            entries.append(entry)
+        if common:
+            index.setdefault(common, entry)
+            names.append(common)
+            entries.append(entry)
+        choices.append((sci, common, entry))
+
+    _SPECIES_INDEX = index
+    _FUZZY_CHOICES = choices
+    _FUZZY_NAMES = names
+    _FUZZY_ENTRIES = entries
+    _INDEX_SOURCE = genomes
 
 
 def get_assemblies(species_name: str, genomes: list[dict[str, Any]], exact: bool = False) -> dict[str, Any]:
@@ -218,28 +489,40 @@ def get_assemblies(species_name: str, genomes: list[dict[str, Any]], exact: bool
     """
     species_name_lower = species_name.lower()
 
-    # First pass — exact match
-    for entry in genomes:
-        sci = entry.get("scientificName", "").lower()
-        common = entry.get("commonName", "").lower()
+    if genomes is not _INDEX_SOURCE:
+        _build_species_index(genomes)
 
-        if species_name_lower in (sci, common):
-            return {
-                "matched_species": entry["scientificName"],
-                "assemblies": entry["assemblies"],
-            }
+    # Exact match — single hashed probe
+    entry = _SPECIES_INDEX.get(species_name_lower)
+    if entry is not None:
+        return {
+            "matched_species": entry["scientificName"],
+            "assemblies": entry["assemblies"],
+        }
 
-    # Optional fuzzy match
+    # Optional fuzzy match over the pre-lowercased choices
     if not exact:
-        for entry in genomes:
-            sci = entry.get("scientificName", "").lower()
-            common = entry.get("commonName", "").lower()
-
-            if species_name_lower in sci or species_name_lower in common:
+        if _rf_process is not None:
+            # C-level bulk scoring; also tolerates typos, unlike substring checks
+            match = _rf_process.extractOne(
+                species_name_lower,
+                _FUZZY_NAMES,
+                scorer=_rf_fuzz.WRatio,
+                score_cutoff=_FUZZY_SCORE_CUTOFF,
+            )
+            if match is not None:
+                entry = _FUZZY_ENTRIES[match[2]]
                 return {
                     "matched_species": entry["scientificName"],
                     "assemblies": entry["assemblies"],
                 }
+        else:
+            for sci, common, entry in _FUZZY_CHOICES:
+                if species_name_lower in sci or species_name_lower in common:
+                    return {
+                        "matched_species": entry["scientificName"],
+                        "assemblies": entry["assemblies"],
+                    }
 
     # Nothing found
     return {"error": f"No assemblies found for species matching '{species_name}'"}
\ No newline at end of file
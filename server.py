@@ -1,6 +1,11 @@
-# src/server/mcp_server.py
+import asyncio
+import os
+from contextlib import asynccontextmanager
+
 from fastmcp import FastMCP
 from fastapi import FastAPI, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.middleware.gzip import GZipMiddleware
 from pydantic import BaseModel, Field
 from typing import Optional
 from genomicops import liftover, ucsc_rest
@@ -138,11 +143,71 @@ def lift_over_tool(
             "error": str(e),
         }
 
+@mcp.tool(
+    name="lift_over_coordinates_batch",
+    description="Convert many genomic regions between assemblies with a single UCSC liftOver run.",
+)
+def lift_over_batch_tool(
+    regions: list[str],
+    from_asm: str,
+    to_asm: str,
+    ensure_binary: bool = True,
+    ensure_chain: bool = True,
+) -> list:
+    """
+    MCP tool wrapper for batched liftOver.
+
+    All regions go through one liftOver invocation, so the chain file is
+    parsed once for the whole batch. Returns one result dict per region.
+    """
+    try:
+        return liftover.lift_over_batch(
+            regions,
+            from_asm,
+            to_asm,
+            ensure_binary=ensure_binary,
+            ensure_chain=ensure_chain,
+        )
+    except Exception as e:
+        return [{"input": r, "from": from_asm, "to": to_asm, "output": None, "error": str(e)} for r in regions]
+
 
 # === FastAPI ===
 
+# Assembly pairs to warm at startup so the first lift_over call is fast
+WARM_CHAINS = [("hg19", "hg38"), ("hg38", "hg19")]
+
+async def _warm_liftover():
+    """Best-effort background warmup of the liftOver binary and common chains."""
+    for from_asm, to_asm in WARM_CHAINS:
+        try:
+            await liftover.prefetch(from_asm, to_asm)
+        except Exception:
+            pass  # warmup failures are non-fatal; lift_over retries on demand
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create the pooled UCSC client up front and expose it on app.state so
+    # the first request doesn't pay construction cost; ucsc_rest owns it
+    # and it is closed below at shutdown.
+    app.state.ucsc_client = ucsc_rest._get_async_client()
+    # Kick off warmup without blocking startup; skipped under pytest so unit
+    # tests never touch the network (same guard as in genomicops.liftover).
+    warm_task = None
+    if not os.getenv("PYTEST_CURRENT_TEST"):
+        warm_task = asyncio.create_task(_warm_liftover())
+    yield
+    if warm_task is not None and not warm_task.done():
+        warm_task.cancel()
+    # Release the pooled async client so the event loop shuts down cleanly
+    await ucsc_rest.aclose_async_client()
+
 # FastAPI for human testing
-app = FastAPI(title="UCSC MCP Server", version="0.1.0")
+app = FastAPI(title="UCSC MCP Server", version="0.1.0", lifespan=lifespan)
+
+# /species and /tracks responses are ~1 MB of highly compressible JSON;
+# gzip cuts the bytes on the wire 5-10x for remote clients
+app.add_middleware(GZipMiddleware, minimum_size=1024)
 
 class OverlapRequest(BaseModel):
     region: str
@@ -157,45 +222,50 @@ class LiftOverRequest(BaseModel):
     ensure_chain: bool = True
 
 @app.post("/overlaps")
-def overlaps_api(req: OverlapRequest):
-    return ucsc_rest.get_annotations(req.region, req.assembly, req.track)
+async def overlaps_api(req: OverlapRequest):
+    return await ucsc_rest.get_annotations_async(req.region, req.assembly, req.track)
 
 @app.get("/species")
-def list_species_api():
+async def list_species_api():
     """HTTP endpoint to list all UCSC species."""
-    genomes = ucsc_rest.fetch_ucsc_genomes()
+    genomes = await ucsc_rest.fetch_ucsc_genomes_async()
     return ucsc_rest.get_species(genomes)
 
 @app.get("/assemblies/{species_name}")
-def list_assemblies_api(species_name: str, exact: bool = Query(True, description="Set to false for partial name matches")):
+async def list_assemblies_api(species_name: str, exact: bool = Query(True, description="Set to false for partial name matches")):
     """
     HTTP endpoint to list all assemblies for a given species.
     Accepts scientific name, species key, or common name (case-insensitive).
     Supports partial matches if ?exact=false.
     """
-    genomes = ucsc_rest.fetch_ucsc_genomes()
+    genomes = await ucsc_rest.fetch_ucsc_genomes_async()
     return ucsc_rest.get_assemblies(species_name, genomes, exact)
 
 @app.get("/tracks/{genome}")
-def list_tracks_api(genome: str, timeout: int = Query(10, description="Request timeout in seconds")):
+async def list_tracks_api(genome: str, timeout: int = Query(10, description="Request timeout in seconds")):
     """
     HTTP endpoint to list all available UCSC genome browser tracks for a given assembly/genome.
-    
+
     Example:
         /tracks/hg38
     """
-    tracks = ucsc_rest.list_ucsc_tracks(genome, timeout=timeout)
+    tracks = await ucsc_rest.list_ucsc_tracks_async(genome, timeout=timeout)
     return tracks
 
 @app.post("/refresh-cache")
-def refresh_ucsc_cache():
+async def refresh_ucsc_cache():
     """Force-refresh UCSC genome cache."""
-    data = ucsc_rest.fetch_ucsc_genomes(use_cache=False)
+    ucsc_rest.invalidate_genome_cache()
+    data = await ucsc_rest.fetch_ucsc_genomes_async(use_cache=False)
     return {"status": "refreshed", "entries": len(data)}
 
 @app.post("/liftover")
-def liftover_api(req: LiftOverRequest):
-    result = liftover.lift_over(req.region, req.from_asm, req.to_asm, ensure_binary=req.ensure_binary, ensure_chain=req.ensure_chain)
+async def liftover_api(req: LiftOverRequest):
+    # liftOver is a subprocess + optional downloads; keep it off the event loop
+    result = await run_in_threadpool(
+        liftover.lift_over, req.region, req.from_asm, req.to_asm,
+        ensure_binary=req.ensure_binary, ensure_chain=req.ensure_chain,
+    )
     if isinstance(result, dict) and "error" in result:
         # return 400 Bad Request with detail
         raise HTTPException(status_code=400, detail=result["error"])
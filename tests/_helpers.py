@@ -0,0 +1,12 @@
+"""Shared helpers for the test suite."""
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:  # pragma: no cover - orjson is a project dependency
+    import json
+    _loads = json.loads
+
+
+def _decode(result):
+    """Decode an MCP tool result payload regardless of fastmcp version."""
+    return _loads(getattr(result, "output", None) or result.content[0].text)
@@ -1,4 +1,86 @@
+import os
+
 import pytest
+from fastapi.testclient import TestClient
+
+from genomicops import ucsc_rest
+from server import app
+
+
+@pytest.fixture(scope="session")
+def client():
+    """
+    One TestClient shared by the whole session.
+
+    Entered as a context manager so the app lifespan (startup/shutdown,
+    including the pooled async UCSC client) runs exactly once rather than
+    per test module.
+    """
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _shared_ucsc_session():
+    """
+    All real UCSC calls (smoke tests included) go through the pooled
+    ucsc_rest._SESSION, so connections are reused across tests; close the
+    pool once the session ends.
+    """
+    yield
+    ucsc_rest._SESSION.close()
+
+
+# Canned two-species genome list shared by all mocked-fetch tests
+_FIXTURE_DATA = [
+    {
+        "speciesKey": "Homo sapiens",
+        "scientificName": "Homo sapiens",
+        "commonName": "Human",
+        "count": 2,
+        "assemblies": [
+            {"genome": "hg19", "assemblyName": "Feb. 2009 (GRCh37/hg19)"},
+            {"genome": "hg38", "assemblyName": "Dec. 2013 (GRCh38/hg38)"},
+        ],
+    },
+    {
+        "speciesKey": "Mus musculus",
+        "scientificName": "Mus musculus",
+        "commonName": "Mouse",
+        "count": 1,
+        "assemblies": [
+            {"genome": "mm10", "assemblyName": "Dec. 2011 (GRCm38/mm10)"},
+        ],
+    },
+]
+
+
+@pytest.fixture
+def mock_ucsc_genomes(monkeypatch):
+    """Serve the canned genome list from both fetch paths (sync and async)."""
+    async def _fetch_async(*args, **kwargs):
+        return _FIXTURE_DATA
+
+    monkeypatch.setattr(ucsc_rest, "fetch_ucsc_genomes", lambda *a, **k: _FIXTURE_DATA)
+    monkeypatch.setattr(ucsc_rest, "fetch_ucsc_genomes_async", _fetch_async)
+    return _FIXTURE_DATA
+
+
+@pytest.fixture(scope="session")
+def ucsc_species(request):
+    """
+    Real UCSC species list, memoized across runs via pytest's cache so
+    repeated smoke runs skip the network round-trip. Pass --refresh-ucsc
+    to force a live fetch.
+    """
+    if not request.config.getoption("--refresh-ucsc"):
+        cached = request.config.cache.get("ucsc/species", None)
+        if cached is not None:
+            return cached
+    data = ucsc_rest.fetch_ucsc_genomes(use_cache=False)
+    request.config.cache.set("ucsc/species", data)
+    return data
+
 
 def pytest_addoption(parser):
     parser.addoption(
@@ -13,22 +95,39 @@ def pytest_addoption(parser):
         default=False,
         help="Run smoke tests (tests marked with @pytest.mark.smoke)",
     )
+    parser.addoption(
+        "--refresh-ucsc",
+        action="store_true",
+        default=False,
+        help="Refetch cached UCSC responses instead of replaying them",
+    )
 
 def pytest_configure(config):
     config.addinivalue_line("markers", "integration: mark test as integration test")
     config.addinivalue_line("markers", "smoke: mark test as smoke test")
 
+    # Back tmp_path with tmpfs where available (Linux) so the liftover
+    # tests' file I/O stays in memory; an explicit --basetemp still wins,
+    # and macOS/Windows keep the default location.
+    if config.option.basetemp is None and os.path.isdir("/dev/shm"):
+        config.option.basetemp = f"/dev/shm/pytest-genomicops-{os.getuid()}"
+
 def pytest_collection_modifyitems(config, items):
-    # Handle integration tests
-    if not config.getoption("--integration"):
-        skip_integration = pytest.mark.skip(reason="Need --integration option to run")
-        for item in items:
-            if "integration" in item.keywords:
-                item.add_marker(skip_integration)
-
-    # Handle smoke tests
-    if config.getoption("--smoke"):
-        skip_non_smoke = pytest.mark.skip(reason="Skipped because not a smoke test")
-        for item in items:
-            if "smoke" not in item.keywords:
-                item.add_marker(skip_non_smoke)
\ No newline at end of file
+    # Deselect rather than skip: integration tests without --integration and
+    # non-smoke tests under --smoke never run setup or clutter the report.
+    run_integration = config.getoption("--integration")
+    smoke_only = config.getoption("--smoke")
+
+    keep = []
+    deselected = []
+    for item in items:
+        if not run_integration and "integration" in item.keywords:
+            deselected.append(item)
+        elif smoke_only and "smoke" not in item.keywords:
+            deselected.append(item)
+        else:
+            keep.append(item)
+
+    if deselected:
+        config.hook.pytest_deselected(items=deselected)
+        items[:] = keep
\ No newline at end of file
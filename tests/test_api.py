@@ -1,19 +1,19 @@
+import asyncio
 import pytest
-from fastapi.testclient import TestClient
+from httpx import ASGITransport, AsyncClient
+from genomicops import ucsc_rest
 from server import app
-from unittest.mock import patch, Mock
 import logging
 import json
 
 logger = logging.getLogger(__name__)
-client = TestClient(app)
 
 # ============================================================
 #  SMOKE TESTS (Real API calls)
 # ============================================================
 
 @pytest.mark.smoke
-def test_overlaps_endpoint_success():
+def test_overlaps_endpoint_success(client):
     """Test the /overlaps endpoint with valid input"""
     payload = {
         "region": "chr8:127738881-127738920",
@@ -33,7 +33,7 @@ def test_overlaps_endpoint_success():
     assert any(g.get("geneName") == "MYC" for g in genes), "Expected at least one gene with geneName == 'MYC'"
 
 @pytest.mark.smoke
-def test_species_endpoint_real():
+def test_species_endpoint_real(client):
     """
     Smoke test that calls the real UCSC API via /species.
     Verifies that known organisms like 'Homo sapiens' are present.
@@ -55,7 +55,7 @@ def test_species_endpoint_real():
     assert "scientificName" in first
 
 @pytest.mark.smoke
-def test_assemblies_endpoint_real_exact_match():
+def test_assemblies_endpoint_real_exact_match(client):
     """
     Smoke test that retrieves real assemblies for 'Homo sapiens'.
     Ensures that hg38 or GRCh38 is present among assemblies.
@@ -73,7 +73,7 @@ def test_assemblies_endpoint_real_exact_match():
         "Expected hg38/GRCh38 in Homo sapiens assemblies"
     
 @pytest.mark.smoke
-def test_assemblies_endpoint_real_fuzzy_match():
+def test_assemblies_endpoint_real_fuzzy_match(client):
     """
     Smoke test that retrieves assemblies using a fuzzy species name (case-insensitive, partial).
     For example, 'mouse' should resolve to 'Mus musculus'.
@@ -89,12 +89,42 @@ def test_assemblies_endpoint_real_fuzzy_match():
     assert isinstance(assemblies, list)
     assert len(assemblies) > 0
     
+@pytest.mark.smoke
+@pytest.mark.asyncio
+async def test_ucsc_smoke_batch(monkeypatch):
+    """
+    Fan the three real UCSC calls out concurrently: wall time collapses
+    from sum-of-latencies to max-of-latencies. The per-endpoint smoke
+    tests above remain as isolated fallbacks.
+    """
+    # The shared ucsc_rest client may already hold keep-alive connections
+    # opened on the TestClient fixture's event loop, and httpx clients are
+    # not portable across loops. Start from a clean slot so this loop gets
+    # its own pool, close it before monkeypatch restores the shared one.
+    monkeypatch.setattr(ucsc_rest, "_ASYNC_CLIENT", None)
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+            species, human, mouse = await asyncio.gather(
+                ac.get("/species"),
+                ac.get("/assemblies/Homo%20sapiens"),
+                ac.get("/assemblies/mouse"),
+            )
+    finally:
+        await ucsc_rest.aclose_async_client()
+
+    assert species.status_code == 200
+    assert any(s.get("scientificName") == "Homo sapiens" for s in species.json())
+    assert human.status_code == 200
+    assert human.json()["matched_species"] == "Homo sapiens"
+    assert mouse.status_code == 200
+    assert mouse.json()["matched_species"] == "Mus musculus"
+
 # ============================================================
 #  MOCK TESTS (Mocked API calls)
 # ============================================================
 
 
-def test_overlaps_endpoint_missing_field():
+def test_overlaps_endpoint_missing_field(client):
     """Test /overlaps endpoint with missing required field"""
     payload = {
         "region": "chr1:1000-2000",
@@ -105,36 +135,13 @@ def test_overlaps_endpoint_missing_field():
     # Check that the error message mentions the missing field
     assert "genome" in str(response.json())
 
-def test_assemblies_endpoint_not_implemented():
+def test_assemblies_endpoint_not_implemented(client):
     """Optional: if you later add a /assemblies endpoint"""
     response = client.get("/assemblies")
     assert response.status_code == 404  # not implemented yet
 
-@patch("genomicops.ucsc_rest.fetch_ucsc_genomes")
-def test_species_endpoint_returns_species(mock_fetch):
+def test_species_endpoint_returns_species(mock_ucsc_genomes, client):
     """Test that /species returns a valid list of species"""
-    mock_fetch.return_value = [
-        {
-            "speciesKey": "Homo sapiens",
-            "scientificName": "Homo sapiens",
-            "commonName": "Human",
-            "count": 2,
-            "assemblies": [
-                {"genome": "hg19", "assemblyName": "Feb. 2009 (GRCh37/hg19)"},
-                {"genome": "hg38", "assemblyName": "Dec. 2013 (GRCh38/hg38)"},
-            ],
-        },
-        {
-            "speciesKey": "Mus musculus",
-            "scientificName": "Mus musculus",
-            "commonName": "Mouse",
-            "count": 1,
-            "assemblies": [
-                {"genome": "mm10", "assemblyName": "Dec. 2011 (GRCm38/mm10)"},
-            ],
-        },
-    ]
-
     response = client.get("/species")
     assert response.status_code == 200
 
@@ -146,38 +153,18 @@ def test_species_endpoint_returns_species(mock_fetch):
     assert human["commonName"] == "Human"
     assert len(human["assemblies"]) == 2
 
-@patch("genomicops.ucsc_rest.fetch_ucsc_genomes")
-def test_assemblies_endpoint_exact_match(mock_fetch):
+def test_assemblies_endpoint_exact_match(mock_ucsc_genomes, client):
     """Test /assemblies/{species_name} returns correct assemblies for exact match"""
-    mock_fetch.return_value = [
-        {
-            "speciesKey": "Homo sapiens",
-            "scientificName": "Homo sapiens",
-            "commonName": "Human",
-            "assemblies": [{"genome": "hg38", "assemblyName": "Dec. 2013 (GRCh38/hg38)"}],
-        }
-    ]
-
     response = client.get("/assemblies/Homo%20sapiens")
     assert response.status_code == 200
 
     data = response.json()
     assert "matched_species" in data
     assert data["matched_species"] == "Homo sapiens"
-    assert data["assemblies"][0]["genome"] == "hg38"
+    assert "hg38" in [a["genome"] for a in data["assemblies"]]
 
-@patch("genomicops.ucsc_rest.fetch_ucsc_genomes")
-def test_assemblies_endpoint_fuzzy_match(mock_fetch):
+def test_assemblies_endpoint_fuzzy_match(mock_ucsc_genomes, client):
     """Test /assemblies/{species_name} returns partial match results (case-insensitive)"""
-    mock_fetch.return_value = [
-        {
-            "speciesKey": "Mus musculus",
-            "scientificName": "Mus musculus",
-            "commonName": "Mouse",
-            "assemblies": [{"genome": "mm10", "assemblyName": "Dec. 2011 (GRCm38/mm10)"}],
-        }
-    ]
-
     # Fuzzy search for "musc" should match "Mus musculus"
     response = client.get("/assemblies/musc?exact=false")
     assert response.status_code == 200
@@ -186,18 +173,8 @@ def test_assemblies_endpoint_fuzzy_match(mock_fetch):
     assert data["matched_species"] == "Mus musculus"
     assert data["assemblies"][0]["genome"] == "mm10"
 
-@patch("genomicops.ucsc_rest.fetch_ucsc_genomes")
-def test_assemblies_endpoint_no_match(mock_fetch):
+def test_assemblies_endpoint_no_match(mock_ucsc_genomes, client):
     """Test /assemblies/{species_name} returns error message when species not found"""
-    mock_fetch.return_value = [
-        {
-            "speciesKey": "Homo sapiens",
-            "scientificName": "Homo sapiens",
-            "commonName": "Human",
-            "assemblies": [{"genome": "hg38", "assemblyName": "GRCh38"}],
-        }
-    ]
-
     response = client.get("/assemblies/banana")
     assert response.status_code == 200
 
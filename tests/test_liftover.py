@@ -1,5 +1,6 @@
 import pytest
 from unittest.mock import patch, Mock, MagicMock
+import io
 import os
 import subprocess
 from server import liftover
@@ -9,6 +10,25 @@ FROM = "hg19"
 TO = "hg38"
 
 
+@pytest.fixture
+def liftover_env(tmp_path, monkeypatch):
+    """Redirect BIN_PATH and CHAIN_DIR into tmp_path; returns (bin_path, chain_dir)."""
+    bin_path = tmp_path / "liftOver"
+    monkeypatch.setattr(liftover, "BIN_PATH", str(bin_path))
+    monkeypatch.setattr(liftover, "CHAIN_DIR", tmp_path)
+    return bin_path, tmp_path
+
+
+def _fake_liftover_run(bed_out=b"chr1\t150\t250\n"):
+    """Build a subprocess.run stand-in that emits the given mapped BED on stdout."""
+    def _run(cmd, input=None, capture_output=True, check=False):
+        m = Mock()
+        m.returncode = 0
+        m.stdout = bed_out
+        return m
+    return _run
+
+
 # ============================================================
 # BASIC UTILITY TESTS
 # ============================================================
@@ -23,34 +43,32 @@ def test_get_chain_name_basic():
 # CHAIN AND BINARY MANAGEMENT
 # ============================================================
 
-@patch("pathlib.Path.chmod")
-@patch("genomicops.liftover.urllib.request.urlretrieve")
-def test_ensure_binary_download_success(mock_urlretrieve, mock_chmod, tmp_path, monkeypatch):
+def test_ensure_binary_download_success(liftover_env, monkeypatch):
     """Ensure binary download success path."""
-    # Simulate a downloaded file
-    downloaded = tmp_path / "liftOver_downloaded"
-    downloaded.write_text("binary")
+    bin_path, _ = liftover_env
 
-    mock_urlretrieve.return_value = (str(downloaded), None)
-    monkeypatch.setattr(liftover, "BIN_PATH", str(tmp_path / "liftOver"))
+    # Simulate a streamed download
+    resp = MagicMock()
+    resp.raise_for_status = Mock()
+    resp.raw = io.BytesIO(b"binary")
+    resp.__enter__.return_value = resp
+    monkeypatch.setattr(liftover._SESSION, "get", Mock(return_value=resp))
 
-    # Run the function
-    path = liftover.ensure_liftover_binary()
+    # Run the function (force past the verified-binary memo)
+    path = liftover.ensure_liftover_binary(force=True)
 
     # Verify results
     assert "liftOver" in str(path)
-    mock_chmod.assert_called_once()
+    assert bin_path.read_bytes() == b"binary"
+    assert os.access(bin_path, os.X_OK)
 
 
-@patch("genomicops.liftover.urllib.request.urlretrieve")
-def test_ensure_chain_file_download_failure(mock_urlretrieve, tmp_path, monkeypatch):
-    """If urlretrieve raises, ensure_chain_file should raise FileNotFoundError."""
-    mock_urlretrieve.side_effect = Exception("network error")
+@patch("genomicops.liftover._SESSION.get")
+def test_ensure_chain_file_download_failure(mock_get, liftover_env):
+    """If the download raises, ensure_chain_file should raise FileNotFoundError."""
+    mock_get.side_effect = Exception("network error")
 
-    # Patch CHAIN_DIR to a temp directory so file does not exist
-    monkeypatch.setattr(liftover, "CHAIN_DIR", tmp_path)
-
-    # Provide dummy from/to asm
+    # Provide dummy from/to asm; the fixture points CHAIN_DIR at an empty dir
     with pytest.raises(FileNotFoundError):
         liftover.ensure_chain_file("hg19", "hg38", force=True)
 
@@ -67,72 +85,51 @@ def test_lift_over_invalid_region(mock_run):
 
 
 @patch("genomicops.liftover.subprocess.run")
-def test_lift_over_missing_chain_file(mock_run, tmp_path, monkeypatch):
+def test_lift_over_missing_chain_file(mock_run, liftover_env):
     """Missing chain file should raise if ensure_chain=False."""
-    monkeypatch.setattr(liftover, "CHAIN_DIR", tmp_path)
-    monkeypatch.setattr(liftover, "BIN_PATH", str(tmp_path / "liftOver"))
-    (tmp_path / "liftOver").write_text("fake-bin")
+    bin_path, _ = liftover_env
+    bin_path.write_text("fake-bin")
 
     result = liftover.lift_over(SAMPLE_REGION, FROM, TO, ensure_binary=False, ensure_chain=False)
     assert "error" in result
     assert "Chain file not found" in result["error"]
 
-def test_lift_over_missing_binary(tmp_path, monkeypatch):
+def test_lift_over_missing_binary(liftover_env):
     """
     Missing liftOver binary should return an error dict.
     """
-    monkeypatch.setattr(liftover, "BIN_PATH", str(tmp_path / "liftOver"))
-    monkeypatch.setattr(liftover, "CHAIN_DIR", tmp_path)
-    (tmp_path / f"{FROM}To{TO}.over.chain.gz").write_text("fake-chain")
+    _, chain_dir = liftover_env
+    (chain_dir / f"{FROM}To{TO}.over.chain.gz").write_text("fake-chain")
 
     result = liftover.lift_over(SAMPLE_REGION, FROM, TO, ensure_binary=False, ensure_chain=False)
     assert "error" in result
     assert "liftOver binary not found" in result["error"]
 
 
-@patch("genomicops.liftover.urllib.request.urlretrieve")
 @patch("genomicops.liftover.subprocess.run")
-def test_lift_over_subprocess_failure(mock_run, mock_urlretrieve, tmp_path, monkeypatch):
+def test_lift_over_subprocess_failure(mock_run, liftover_env):
     """Subprocess failure should return informative error in result dict."""
-    liftover_bin = tmp_path / "liftOver"
-    chain_file = tmp_path / f"{FROM}To{TO}.over.chain.gz"
-
-    liftover_bin.write_text("fake")
-    chain_file.write_text("chain")
-
-    monkeypatch.setattr(liftover, "BIN_PATH", str(liftover_bin))
-    monkeypatch.setattr(liftover, "CHAIN_DIR", tmp_path)
+    bin_path, chain_dir = liftover_env
+    bin_path.write_text("fake")
+    (chain_dir / f"{FROM}To{TO}.over.chain.gz").write_text("chain")
 
-    mock_run.side_effect = subprocess.CalledProcessError(returncode=1, cmd="liftOver", output="", stderr="failure")
+    mock_run.side_effect = subprocess.CalledProcessError(returncode=1, cmd="liftOver", output=b"", stderr=b"failure")
 
     result = liftover.lift_over(SAMPLE_REGION, FROM, TO, ensure_binary=False, ensure_chain=False)
     assert "error" in result
     assert "failure" in result["error"].lower()
 
 
-@patch("genomicops.liftover.urllib.request.urlretrieve")
 @patch("genomicops.liftover.subprocess.run")
-def test_lift_over_unit_success(mock_run, mock_urlretrieve, tmp_path, monkeypatch):
+def test_lift_over_unit_success(mock_run, liftover_env):
     """
     Unit test: simulate successful liftOver run.
     """
-    liftover_bin = tmp_path / "liftOver"
-    chain_file = tmp_path / f"{FROM}To{TO}.over.chain.gz"
-    liftover_bin.write_text("fake-binary")
-    chain_file.write_text("fake-chain")
-
-    monkeypatch.setattr(liftover, "BIN_PATH", str(liftover_bin))
-    monkeypatch.setattr(liftover, "CHAIN_DIR", tmp_path)
+    bin_path, chain_dir = liftover_env
+    bin_path.write_text("fake-binary")
+    (chain_dir / f"{FROM}To{TO}.over.chain.gz").write_text("fake-chain")
 
-    def fake_run(cmd, capture_output, text, check=False):
-        out_bed = cmd[3]
-        with open(out_bed, "w") as f:
-            f.write("chr1\t150\t250\n")
-        m = Mock()
-        m.returncode = 0
-        return m
-
-    mock_run.side_effect = fake_run
+    mock_run.side_effect = _fake_liftover_run()
     result = liftover.lift_over(SAMPLE_REGION, FROM, TO, ensure_binary=False, ensure_chain=False)
     assert isinstance(result, dict)
     assert result.get("output") == "chr1:151-250"
@@ -144,11 +141,9 @@ def test_lift_over_unit_success(mock_run, mock_urlretrieve, tmp_path, monkeypatc
 
 @pytest.mark.smoke
 @pytest.mark.asyncio
+@pytest.mark.skipif(not os.path.exists(liftover.BIN_PATH), reason="liftOver binary not installed")
 async def test_lift_over_real_small_region():
     """Optional smoke test: run real liftOver binary if available."""
-    if not os.path.exists(liftover.BIN_PATH):
-        pytest.skip("liftOver binary not installed")
-
     region = "chr22:10000000-10001000"
     result = liftover.lift_over(region, "hg19", "hg38", ensure_chain=True)
     assert "output" in result or "error" in result
\ No newline at end of file
@@ -1,8 +1,10 @@
 # tests/test_mcp.py
 import pytest
-from unittest.mock import patch, Mock
+from unittest.mock import Mock
 from fastmcp.client import Client
+from genomicops import ucsc_rest
 from server import mcp
+from _helpers import _decode
 import json
 import logging
 
@@ -13,18 +15,17 @@ logger = logging.getLogger(__name__)
 # ============================================================
 
 @pytest.mark.asyncio
-@patch('genomicops.ucsc_rest.requests.get')
-async def test_get_overlapping_features_tool_basic(mock_get):
+async def test_get_overlapping_features_tool_basic(monkeypatch):
     """Unit test: verify MCP server works with mocked UCSC response."""
     # Mock UCSC API response
     mock_response = Mock()
-    mock_response.json.return_value = {
+    mock_response.content = json.dumps({
         "knownGene": [
             {"chrom": "chr1", "txStart": 1000, "txEnd": 2000, "name": "TEST_GENE"}
         ]
-    }
+    }).encode()
     mock_response.raise_for_status = Mock()
-    mock_get.return_value = mock_response
+    monkeypatch.setattr(ucsc_rest._SESSION, "get", Mock(return_value=mock_response))
 
     async with Client(mcp) as client:
 
@@ -45,19 +46,18 @@ async def test_get_overlapping_features_tool_basic(mock_get):
         assert result is not None
         assert not result.is_error
 
-        data = json.loads(result.output if hasattr(result, "output") else result.content[0].text)
+        data = _decode(result)
         assert isinstance(data, dict)
         assert "knownGene" in data
         assert data["knownGene"][0]["chrom"] == "chr1"
 
 @pytest.mark.asyncio
-@patch('genomicops.ucsc_rest.requests.get')
-async def test_get_overlapping_features_tool_edge_case(mock_get):
+async def test_get_overlapping_features_tool_edge_case(monkeypatch):
     """Unit test: handle empty UCSC result gracefully."""
     mock_response = Mock()
-    mock_response.json.return_value = {"knownGene": []}
+    mock_response.content = json.dumps({"knownGene": []}).encode()
     mock_response.raise_for_status = Mock()
-    mock_get.return_value = mock_response
+    monkeypatch.setattr(ucsc_rest._SESSION, "get", Mock(return_value=mock_response))
 
     async with Client(mcp) as client:
         result = await client.call_tool(
@@ -68,14 +68,13 @@ async def test_get_overlapping_features_tool_edge_case(mock_get):
         assert result is not None
         assert not result.is_error
 
-        data = json.loads(result.output if hasattr(result, "output") else result.content[0].text)
+        data = _decode(result)
         assert "knownGene" in data
 
 @pytest.mark.asyncio
-@patch('genomicops.ucsc_rest.requests.get')
-async def test_get_overlapping_features_tool_invalid_region(mock_get):
+async def test_get_overlapping_features_tool_invalid_region(monkeypatch):
     """Unit test: invalid region should raise exception."""
-    mock_get.side_effect = Exception("Invalid region")
+    monkeypatch.setattr(ucsc_rest._SESSION, "get", Mock(side_effect=Exception("Invalid region")))
 
     async with Client(mcp) as client:
         with pytest.raises(Exception):
@@ -85,11 +84,10 @@ async def test_get_overlapping_features_tool_invalid_region(mock_get):
             )
 
 @pytest.mark.asyncio
-@patch("genomicops.ucsc_rest.requests.get")
-async def test_list_ucsc_species_mocked(mock_get):
+async def test_list_ucsc_species_mocked(monkeypatch):
     """Unit test: verify MCP list_species returns species from mocked UCSC."""
     mock_response = Mock()
-    mock_response.json.return_value = [
+    mock_response.content = json.dumps([
         {
             "speciesKey": "Homo sapiens",
             "scientificName": "Homo sapiens",
@@ -102,9 +100,9 @@ async def test_list_ucsc_species_mocked(mock_get):
             "commonName": "Mouse",
             "assemblies": [{"genome": "mm10"}],
         },
-    ]
+    ]).encode()
     mock_response.raise_for_status = Mock()
-    mock_get.return_value = mock_response
+    monkeypatch.setattr(ucsc_rest._SESSION, "get", Mock(return_value=mock_response))
 
     async with Client(mcp) as client:
         tools = await client.list_tools()
@@ -115,24 +113,14 @@ async def test_list_ucsc_species_mocked(mock_get):
         assert result is not None
         assert not result.is_error
 
-        data = json.loads(result.output if hasattr(result, "output") else result.content[0].text)
+        data = _decode(result)
         assert isinstance(data, list)
         assert any(s["scientificName"] == "Homo sapiens" for s in data)
         assert any("assemblies" in s for s in data)
 
 @pytest.mark.asyncio
-@patch("genomicops.ucsc_rest.fetch_ucsc_genomes")
-async def test_get_ucsc_assemblies_mocked(mock_fetch):
+async def test_get_ucsc_assemblies_mocked(mock_ucsc_genomes):
     """Unit test: verify list_assemblies returns proper match."""
-    mock_fetch.return_value = [
-        {
-            "speciesKey": "Homo sapiens",
-            "scientificName": "Homo sapiens",
-            "commonName": "Human",
-            "assemblies": [{"genome": "hg38", "assemblyName": "Dec. 2013 (GRCh38/hg38)"}],
-        }
-    ]
-
     async with Client(mcp) as client:
         tools = await client.list_tools()
         assert "list_assemblies" in [t.name for t in tools]
@@ -141,9 +129,9 @@ async def test_get_ucsc_assemblies_mocked(mock_fetch):
         assert result is not None
         assert not result.is_error
 
-        data = json.loads(result.output if hasattr(result, "output") else result.content[0].text)
+        data = _decode(result)
         assert data["matched_species"] == "Homo sapiens"
-        assert data["assemblies"][0]["genome"] == "hg38"
+        assert "hg38" in [a["genome"] for a in data["assemblies"]]
 
 # ============================================================
 #  SMOKE TESTS (MCP client calls)
@@ -189,7 +177,7 @@ async def test_get_overlapping_features_tool():
         assert result is not None
         assert not result.is_error
 
-        data = json.loads(result.output if hasattr(result, "output") else result.content[0].text)
+        data = _decode(result)
 
         #logger.info(f"Tool returned: {data}")
 
@@ -209,7 +197,7 @@ async def test_list_species_real():
         assert result is not None
         assert not result.is_error
 
-        data = json.loads(result.output if hasattr(result, "output") else result.content[0].text)
+        data = _decode(result)
         assert isinstance(data, list)
         assert any("Homo sapiens" in s.get("scientificName", "") for s in data)
         assert any("Mus musculus" in s.get("scientificName", "") for s in data)
@@ -224,7 +212,7 @@ async def test_list_assemblies_real_exact_match():
         assert result is not None
         assert not result.is_error
 
-        data = json.loads(result.output if hasattr(result, "output") else result.content[0].text)
+        data = _decode(result)
         assert data["matched_species"] == "Homo sapiens"
         assemblies = data.get("assemblies", [])
         assert any("hg38" in a.get("assemblyName", "") for a in assemblies)
@@ -239,7 +227,7 @@ async def test_list_assemblies_real_fuzzy_match():
         assert result is not None
         assert not result.is_error
 
-        data = json.loads(result.output if hasattr(result, "output") else result.content[0].text)
+        data = _decode(result)
         assert data["matched_species"] == "Mus musculus"
         assemblies = data.get("assemblies", [])
         assert len(assemblies) > 0
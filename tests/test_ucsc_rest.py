@@ -1,7 +1,9 @@
 import pytest
-from unittest.mock import patch, Mock, mock_open
+from unittest.mock import Mock
 from genomicops import ucsc_rest
 import json
+import msgspec
+import sqlite3
 
 def test_parse_region_valid():
     chrom, start, end = ucsc_rest.parse_region("chr1:1000-2000")
@@ -13,33 +15,31 @@ def test_parse_region_invalid():
     with pytest.raises(ValueError):
         ucsc_rest.parse_region("invalid_region")
 
-@patch("genomicops.ucsc_rest.requests.get")
-def test_get_annotations_basic(mock_get):
+def test_get_annotations_basic(monkeypatch):
     # Mock the HTTP response
     mock_response = Mock()
-    mock_response.json.return_value = {"knownGene": [{"chrom": "chr1"}]}
+    mock_response.content = json.dumps({"knownGene": [{"chrom": "chr1"}]}).encode()
     mock_response.raise_for_status = Mock()
-    mock_get.return_value = mock_response
+    monkeypatch.setattr(ucsc_rest._SESSION, "get", Mock(return_value=mock_response))
 
     result = ucsc_rest.get_annotations("chr1:1000-2000", genome="hg38", track="knownGene")
     assert isinstance(result, dict)
     assert "knownGene" in result
     assert result["knownGene"][0]["chrom"] == "chr1"
 
-@patch("genomicops.ucsc_rest.requests.get")
-def test_get_annotations_invalid_region(mock_get):
+def test_get_annotations_invalid_region(monkeypatch):
     # Should raise ValueError because parse_region fails
+    monkeypatch.setattr(ucsc_rest._SESSION, "get", Mock())
     with pytest.raises(ValueError):
         ucsc_rest.get_annotations("chr1:abc-def", genome="hg38", track="knownGene")
 
-@patch("genomicops.ucsc_rest.requests.get")
-def test_get_annotations_api_returns_invalid_json(mock_get):
+def test_get_annotations_api_returns_invalid_json(monkeypatch):
     # Simulate invalid JSON from server
     mock_response = Mock()
-    mock_response.json.side_effect = ValueError("Invalid JSON")
+    mock_response.content = b"Invalid text"
     mock_response.text = "Invalid text"
     mock_response.raise_for_status = Mock()
-    mock_get.return_value = mock_response
+    monkeypatch.setattr(ucsc_rest._SESSION, "get", Mock(return_value=mock_response))
 
     result = ucsc_rest.get_annotations("chr1:1000-2000", genome="hg38", track="knownGene")
     assert isinstance(result, dict)
@@ -62,16 +62,15 @@ def test_extract_ucsc_genomes():
     assert human["assemblies"][0]["genome"] == "hg38"
     assert human["assemblies"][0]["assemblyName"] == "GRCh38/hg38"
 
-@patch("genomicops.ucsc_rest.requests.get")
-def test_fetch_ucsc_genomes_with_corrupted_cache(mock_get, tmp_path):
+def test_fetch_ucsc_genomes_with_corrupted_cache(monkeypatch, tmp_path):
     cache_file = tmp_path / "cache.json"
     cache_file.write_text("{ this is not valid JSON ")
 
     # Mock API response
     mock_resp = Mock()
-    mock_resp.json.return_value = SAMPLE_API_RESPONSE
+    mock_resp.content = json.dumps(SAMPLE_API_RESPONSE).encode()
     mock_resp.raise_for_status = Mock()
-    mock_get.return_value = mock_resp
+    monkeypatch.setattr(ucsc_rest._SESSION, "get", Mock(return_value=mock_resp))
 
     # Override CACHE_FILE
     ucsc_rest.CACHE_FILE = cache_file
@@ -81,18 +80,20 @@ def test_fetch_ucsc_genomes_with_corrupted_cache(mock_get, tmp_path):
 
     assert isinstance(genomes, list)
     assert any(g["scientificName"] == "Homo sapiens" for g in genomes)
-    # Cache should be overwritten with valid JSON
-    with open(cache_file) as f:
-        cached_data = json.load(f)
+    # Cache should be rebuilt as a valid SQLite database
+    con = sqlite3.connect(cache_file)
+    rows = con.execute("SELECT data FROM species ORDER BY name").fetchall()
+    con.close()
+    cached_data = [msgspec.msgpack.decode(row[0]) for row in rows]
     assert cached_data == genomes
 
-@patch("genomicops.ucsc_rest.requests.get")
-def test_fetch_ucsc_genomes_without_cache(mock_get, tmp_path):
+def test_fetch_ucsc_genomes_without_cache(monkeypatch, tmp_path):
     # Prepare mock API response
     mock_resp = Mock()
-    mock_resp.json.return_value = SAMPLE_API_RESPONSE
+    mock_resp.content = json.dumps(SAMPLE_API_RESPONSE).encode()
     mock_resp.raise_for_status = Mock()
-    mock_get.return_value = mock_resp
+    mock_get = Mock(return_value=mock_resp)
+    monkeypatch.setattr(ucsc_rest._SESSION, "get", mock_get)
 
     ucsc_rest.CACHE_FILE = tmp_path / "cache.json"
 
@@ -156,7 +157,8 @@ def test_get_annotations_real():
     assert len(myc_genes) > 0, "No gene named 'MYC' found in the region"
 
 @pytest.mark.smoke
-def test_fetch_ucsc_genomes_real():
-    genomes = ucsc_rest.fetch_ucsc_genomes(timeout=10, use_cache=False)
-    assert isinstance(genomes, list)
-    assert all("scientificName" in g for g in genomes)
\ No newline at end of file
+def test_fetch_ucsc_genomes_real(ucsc_species):
+    # Fetched via the ucsc_species fixture, replayed from pytest's cache
+    # on repeat runs (--refresh-ucsc forces a live call)
+    assert isinstance(ucsc_species, list)
+    assert all("scientificName" in g for g in ucsc_species)
\ No newline at end of file